@@ -6,16 +6,27 @@ import json
 import logging
 import os
 import random
-import re
 import sqlite3
-from dataclasses import dataclass
+import threading
+import time
+import weakref
+from bisect import bisect_right
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
 from datetime import datetime, timezone
 from functools import lru_cache
 from pathlib import Path
+from typing import NamedTuple
 
 from aiogram import Bot, Dispatcher, F
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
 from aiogram.filters import CommandStart, Command
+from aiogram.methods import EditMessageReplyMarkup, EditMessageText, SendMessage, SendPhoto
 from aiogram.types import (
     BufferedInputFile,
     CallbackQuery,
@@ -35,6 +46,11 @@ except ImportError:
     ImageFilter = None
     ImageFont = None
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 
 ID_DATE_ANCHORS: list[tuple[int, datetime]] = [
     (1, datetime(2013, 8, 14, tzinfo=timezone.utc)),
@@ -46,19 +62,26 @@ ID_DATE_ANCHORS: list[tuple[int, datetime]] = [
     (6_000_000_000, datetime(2024, 7, 1, tzinfo=timezone.utc)),
     (7_000_000_000, datetime(2025, 7, 1, tzinfo=timezone.utc)),
 ]
+_ANCHOR_IDS: tuple[int, ...] = tuple(anchor_id for anchor_id, _ in ID_DATE_ANCHORS)
+_ANCHOR_TS: tuple[float, ...] = tuple(anchor_date.timestamp() for _, anchor_date in ID_DATE_ANCHORS)
+
+# UPDATE/INSERT ... RETURNING is available since SQLite 3.35.
+SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
 
 
 @dataclass(frozen=True)
 class Settings:
     bot_token: str
     channel_id: int
-    admin_ids: set[int]
+    admin_ids: frozenset[int]
     db_path: str
     min_account_age_days: int
     max_captcha_attempts: int
     risk_score_to_admin: int
     risk_score_to_hard_captcha: int
     hard_captcha_attempts: int
+    admin_fanout_concurrency: int
+    http_pool_limit: int
 
     @staticmethod
     def from_env() -> "Settings":
@@ -71,6 +94,8 @@ class Settings:
         risk_score_to_admin = int(os.getenv("RISK_SCORE_TO_ADMIN", "7"))
         risk_score_to_hard_captcha = int(os.getenv("RISK_SCORE_TO_HARD_CAPTCHA", "4"))
         hard_captcha_attempts = int(os.getenv("HARD_CAPTCHA_ATTEMPTS", "1"))
+        admin_fanout_concurrency = int(os.getenv("ADMIN_FANOUT_CONCURRENCY", "5"))
+        http_pool_limit = int(os.getenv("HTTP_POOL_LIMIT", "128"))
 
         if not bot_token:
             raise ValueError("BOT_TOKEN is required")
@@ -96,66 +121,274 @@ class Settings:
             raise ValueError("RISK_SCORE_TO_HARD_CAPTCHA must be >= 0")
         if risk_score_to_admin <= risk_score_to_hard_captcha:
             raise ValueError("RISK_SCORE_TO_ADMIN must be greater than RISK_SCORE_TO_HARD_CAPTCHA")
+        if admin_fanout_concurrency < 1:
+            raise ValueError("ADMIN_FANOUT_CONCURRENCY must be >= 1")
+        if http_pool_limit < 1:
+            raise ValueError("HTTP_POOL_LIMIT must be >= 1")
 
         return Settings(
             bot_token=bot_token,
             channel_id=int(channel_raw),
-            admin_ids=admin_ids,
+            admin_ids=frozenset(admin_ids),
             db_path=db_path,
             min_account_age_days=min_account_age_days,
             max_captcha_attempts=max_captcha_attempts,
             risk_score_to_admin=risk_score_to_admin,
             risk_score_to_hard_captcha=risk_score_to_hard_captcha,
             hard_captcha_attempts=hard_captcha_attempts,
+            admin_fanout_concurrency=admin_fanout_concurrency,
+            http_pool_limit=http_pool_limit,
         )
 
 
+@dataclass(frozen=True, slots=True)
+class JoinRequestRecord:
+    """One join_requests row; field order matches the CREATE TABLE column order."""
+
+    id: int
+    channel_id: int
+    user_id: int
+    user_chat_id: int
+    username: str | None
+    first_name: str
+    last_name: str | None
+    submitted_at: int
+    status: str
+    is_suspicious: int
+    estimated_age_days: int | None
+    risk_score: int
+    risk_reasons: str | None
+    captcha_question: str | None
+    # Declared INTEGER, so all-digit answers come back as int.
+    captcha_answer: str | int | None
+    captcha_attempts: int
+    captcha_max_attempts: int
+    captcha_difficulty: str
+    decision_by: int | None
+    decision_at: int | None
+    reason: str | None
+
+
+# Migrated databases have a different physical column order, so always select by name.
+JOIN_REQUEST_COLUMNS = tuple(field.name for field in fields(JoinRequestRecord))
+JOIN_REQUEST_COLUMNS_SQL = ", ".join(JOIN_REQUEST_COLUMNS)
+
+
+class PendingCaptcha(NamedTuple):
+    """The columns a captcha answer needs; a plain tuple so handlers can unpack it."""
+
+    id: int
+    channel_id: int
+    user_id: int
+    user_chat_id: int
+    captcha_answer: str | int | None
+    captcha_attempts: int
+    captcha_max_attempts: int
+    captcha_difficulty: str
+
+
+# SQL that depends on the column list is assembled once here; sqlite3's statement cache
+# (cached_statements) then reuses the compiled statement for every call.
+_SQL_UPSERT_REQUEST = """
+    INSERT INTO join_requests (
+        channel_id, user_id, user_chat_id, username, first_name, last_name, submitted_at,
+        status, is_suspicious, estimated_age_days, risk_score, risk_reasons, captcha_question, captcha_answer,
+        captcha_attempts, captcha_max_attempts, captcha_difficulty, decision_by, decision_at, reason
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, 'new', 0, NULL, 0, NULL, NULL, NULL, 0, 3, 'normal', NULL, NULL, NULL)
+    ON CONFLICT(channel_id, user_id) DO UPDATE SET
+        user_chat_id=excluded.user_chat_id,
+        username=excluded.username,
+        first_name=excluded.first_name,
+        last_name=excluded.last_name,
+        submitted_at=excluded.submitted_at,
+        status='new',
+        is_suspicious=0,
+        estimated_age_days=NULL,
+        risk_score=0,
+        risk_reasons=NULL,
+        captcha_question=NULL,
+        captcha_answer=NULL,
+        captcha_attempts=0,
+        captcha_max_attempts=3,
+        captcha_difficulty='normal',
+        decision_by=NULL,
+        decision_at=NULL,
+        reason=NULL
+"""
+_SQL_UPSERT_REQUEST_RETURNING_ID = _SQL_UPSERT_REQUEST + " RETURNING id"
+_SQL_REQUEST_BY_ID = f"SELECT {JOIN_REQUEST_COLUMNS_SQL} FROM join_requests WHERE id = ?"
+_SQL_PENDING_CAPTCHA_BY_USER = f"""
+    SELECT {", ".join(PendingCaptcha._fields)}
+    FROM join_requests
+    WHERE user_id = ?
+      AND status = 'pending_captcha'
+    ORDER BY submitted_at DESC
+    LIMIT 1
+"""
+_SQL_LIST_PENDING_ADMIN = f"""
+    SELECT {JOIN_REQUEST_COLUMNS_SQL} FROM join_requests
+    WHERE status = 'pending_admin'
+    ORDER BY submitted_at ASC
+    LIMIT ?
+"""
+_SQL_LIST_RECENT_DECISIONS = f"""
+    SELECT {JOIN_REQUEST_COLUMNS_SQL} FROM join_requests
+    WHERE decision_at IS NOT NULL
+    ORDER BY decision_at DESC
+    LIMIT ?
+"""
+
+
+@dataclass(frozen=True)
+class ClaimStatements:
+    update_returning: str
+    select: str
+    update: str
+
+    @classmethod
+    def for_condition(cls, condition: str) -> ClaimStatements:
+        update = f"UPDATE join_requests SET status = 'processing' WHERE {condition}"
+        return cls(
+            update_returning=f"{update} RETURNING {JOIN_REQUEST_COLUMNS_SQL}",
+            select=f"SELECT {JOIN_REQUEST_COLUMNS_SQL} FROM join_requests WHERE {condition}",
+            update=update,
+        )
+
+
+_CLAIM_PENDING_ADMIN = ClaimStatements.for_condition("id = ? AND status = 'pending_admin'")
+_CLAIM_PENDING_CAPTCHA = ClaimStatements.for_condition("id = ? AND user_id = ? AND status = 'pending_captcha'")
+
+
+def _join_request_record(cursor: sqlite3.Cursor, row: tuple) -> JoinRequestRecord:
+    return JoinRequestRecord(*row)
+
+
+@dataclass(frozen=True)
+class PanelSnapshot:
+    mode: str
+    stats: dict[str, int]
+    recent: list[JoinRequestRecord]
+    pending: list[JoinRequestRecord]
+
+
+# Bump together with a new step in Storage._migrate_join_requests_schema.
+SCHEMA_VERSION = 1
+
+
+def _log_failed_write(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logging.error("Queued write failed: %s", future.exception())
+
+
 class Storage:
+    WRITE_BATCH_SIZE = 64
+    READ_POOL_SIZE = 4
+
     def __init__(self, db_path: str) -> None:
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(db_path)
+        # One worker thread owns the writer connection, so SQLite keeps a single writer and the loop never blocks.
+        # Reads run on their own pool with read-only connections (see _read_conn).
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="join-guard-db")
+        # Autocommit mode: every transaction is opened explicitly through transaction().
+        self.conn = sqlite3.connect(
+            db_path, isolation_level=None, check_same_thread=False, cached_statements=256
+        )
         self.conn.row_factory = sqlite3.Row
+        # WAL keeps `<db>-wal` and `<db>-shm` files next to the database while the bot runs.
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-64000")
+        # Wait for a lock held by another process (e.g. a backup or sqlite3 shell) instead of failing fast.
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self.conn.execute("PRAGMA foreign_keys=ON")
         self._init_schema()
+        # WAL lets readers run beside the writer: each read thread lazily opens its own read-only connection.
+        self._read_uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        self._read_executor = ThreadPoolExecutor(
+            max_workers=self.READ_POOL_SIZE, thread_name_prefix="join-guard-db-read"
+        )
+        self._read_local = threading.local()
+        self._read_conns: list[sqlite3.Connection] = []
+        self._read_conns_lock = threading.Lock()
+        self._write_queue: asyncio.Queue[tuple[str, tuple, asyncio.Future]] = asyncio.Queue()
+        self._writer_task: asyncio.Task | None = None
 
     def _init_schema(self) -> None:
-        self.conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS join_requests (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                channel_id INTEGER NOT NULL,
-                user_id INTEGER NOT NULL,
-                user_chat_id INTEGER NOT NULL,
-                username TEXT,
-                first_name TEXT NOT NULL,
-                last_name TEXT,
-                submitted_at INTEGER NOT NULL,
-                status TEXT NOT NULL,
-                is_suspicious INTEGER NOT NULL DEFAULT 0,
-                estimated_age_days INTEGER,
-                risk_score INTEGER NOT NULL DEFAULT 0,
-                risk_reasons TEXT,
-                captcha_question TEXT,
-                captcha_answer INTEGER,
-                captcha_attempts INTEGER NOT NULL DEFAULT 0,
-                captcha_max_attempts INTEGER NOT NULL DEFAULT 3,
-                captcha_difficulty TEXT NOT NULL DEFAULT 'normal',
-                decision_by INTEGER,
-                decision_at INTEGER,
-                reason TEXT,
-                UNIQUE(channel_id, user_id)
+        with self.transaction():
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS join_requests (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    user_chat_id INTEGER NOT NULL,
+                    username TEXT,
+                    first_name TEXT NOT NULL,
+                    last_name TEXT,
+                    submitted_at INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    is_suspicious INTEGER NOT NULL DEFAULT 0,
+                    estimated_age_days INTEGER,
+                    risk_score INTEGER NOT NULL DEFAULT 0,
+                    risk_reasons TEXT,
+                    captcha_question TEXT,
+                    captcha_answer INTEGER,
+                    captcha_attempts INTEGER NOT NULL DEFAULT 0,
+                    captcha_max_attempts INTEGER NOT NULL DEFAULT 3,
+                    captcha_difficulty TEXT NOT NULL DEFAULT 'normal',
+                    decision_by INTEGER,
+                    decision_at INTEGER,
+                    reason TEXT,
+                    UNIQUE(channel_id, user_id)
+                )
+                """
             )
-            """
-        )
-        self.conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS bot_settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS bot_settings (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+                """
             )
+            user_version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            if user_version < SCHEMA_VERSION:
+                self._migrate_join_requests_schema()
+                self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._release_stale_claims()
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jr_status_submitted ON join_requests(status, submitted_at)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jr_decision_at ON join_requests(decision_at) WHERE decision_at IS NOT NULL"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jr_submitted_at ON join_requests(submitted_at)")
+            # Captcha answers look the pending request up by user; without this it scans every pending_captcha row.
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jr_user_status_submitted ON join_requests(user_id, status, submitted_at)"
+            )
+        # Refresh planner statistics. The reads run on other connections, so the writer's own query history
+        # says nothing; before 3.46 PRAGMA optimize cannot be told to check every table, so ANALYZE directly.
+        self.conn.execute("PRAGMA analysis_limit=400")
+        if sqlite3.sqlite_version_info >= (3, 46, 0):
+            self.conn.execute("PRAGMA optimize=0x10002")
+        else:
+            self.conn.execute("ANALYZE")
+
+    def _release_stale_claims(self) -> None:
+        # A claim left in 'processing' means the previous run stopped mid-decision; hand it back for review.
+        # Only the captcha route stores a question, so it tells the two pending states apart.
+        released = self.conn.execute(
             """
-        )
-        self._migrate_join_requests_schema()
-        self.conn.commit()
+            UPDATE join_requests
+            SET status = CASE WHEN captcha_question IS NULL THEN 'pending_admin' ELSE 'pending_captcha' END
+            WHERE status = 'processing'
+            """
+        ).rowcount
+        if released:
+            logging.warning("Released %s request(s) left in 'processing' by a previous run", released)
 
     def _migrate_join_requests_schema(self) -> None:
         columns = {
@@ -172,65 +405,157 @@ class Storage:
         if "captcha_difficulty" not in columns:
             self.conn.execute("ALTER TABLE join_requests ADD COLUMN captcha_difficulty TEXT NOT NULL DEFAULT 'normal'")
 
-    def create_or_refresh_request(self, join_request: ChatJoinRequest) -> int:
-        user = join_request.from_user
-        now = int(datetime.now(tz=timezone.utc).timestamp())
+    def enqueue(self, sql: str, params: tuple = ()) -> asyncio.Future:
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._write_loop())
+        future = asyncio.get_running_loop().create_future()
+        self._write_queue.put_nowait((sql, params, future))
+        return future
 
-        self.conn.execute(
-            """
-            INSERT INTO join_requests (
-                channel_id, user_id, user_chat_id, username, first_name, last_name, submitted_at,
-                status, is_suspicious, estimated_age_days, risk_score, risk_reasons, captcha_question, captcha_answer,
-                captcha_attempts, captcha_max_attempts, captcha_difficulty, decision_by, decision_at, reason
+    async def _write(self, sql: str, params: tuple = ()) -> list[tuple] | int:
+        return await self.enqueue(sql, params)
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._db_executor, func, *args)
+
+    async def _read(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._read_executor, func, *args)
+
+    def _read_conn(self) -> sqlite3.Connection:
+        conn = getattr(self._read_local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self._read_uri, uri=True, isolation_level=None, check_same_thread=False, cached_statements=256
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, 'new', 0, NULL, 0, NULL, NULL, NULL, 0, 3, 'normal', NULL, NULL, NULL)
-            ON CONFLICT(channel_id, user_id) DO UPDATE SET
-                user_chat_id=excluded.user_chat_id,
-                username=excluded.username,
-                first_name=excluded.first_name,
-                last_name=excluded.last_name,
-                submitted_at=excluded.submitted_at,
-                status='new',
-                is_suspicious=0,
-                estimated_age_days=NULL,
-                risk_score=0,
-                risk_reasons=NULL,
-                captcha_question=NULL,
-                captcha_answer=NULL,
-                captcha_attempts=0,
-                captcha_max_attempts=3,
-                captcha_difficulty='normal',
-                decision_by=NULL,
-                decision_at=NULL,
-                reason=NULL
-            """,
-            (
-                join_request.chat.id,
-                user.id,
-                join_request.user_chat_id,
-                user.username,
-                user.first_name,
-                user.last_name,
-                now,
-            ),
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-16000")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._read_local.conn = conn
+            with self._read_conns_lock:
+                self._read_conns.append(conn)
+        return conn
+
+    async def _fetch_record(self, sql: str, params: tuple = ()) -> JoinRequestRecord | None:
+        return await self._read(self._execute_fetch_record, sql, params)
+
+    async def _fetchvalue(self, sql: str, params: tuple = ()) -> object | None:
+        return await self._read(self._execute_fetchvalue, sql, params)
+
+    def _record_cursor(self) -> sqlite3.Cursor:
+        cursor = self._read_conn().cursor()
+        cursor.row_factory = _join_request_record
+        return cursor
+
+    def _execute_fetch_record(self, sql: str, params: tuple) -> JoinRequestRecord | None:
+        return self._record_cursor().execute(sql, params).fetchone()
+
+    def _execute_fetch_records(self, sql: str, params: tuple) -> list[JoinRequestRecord]:
+        return self._record_cursor().execute(sql, params).fetchall()
+
+    def _execute_fetchvalue(self, sql: str, params: tuple) -> object | None:
+        cursor = self._read_conn().cursor()
+        cursor.row_factory = None
+        row = cursor.execute(sql, params).fetchone()
+        return None if row is None else row[0]
+
+    async def _write_loop(self) -> None:
+        while True:
+            batch = [await self._write_queue.get()]
+            while len(batch) < self.WRITE_BATCH_SIZE and not self._write_queue.empty():
+                batch.append(self._write_queue.get_nowait())
+            try:
+                statements = [(sql, params) for sql, params, _ in batch]
+                try:
+                    results = await self._run(self._commit_batch, statements)
+                except Exception as exc:
+                    results = [exc] * len(batch)
+                for (_, _, future), result in zip(batch, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, BaseException):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+
+    def _commit_batch(self, statements: list[tuple[str, tuple]]) -> list[list[tuple] | int | BaseException]:
+        results: list[list[tuple] | int | BaseException] = []
+        # Writes only ever return RETURNING scalars, so plain tuples are enough; statements without
+        # RETURNING report their rowcount instead so callers can tell whether a guarded UPDATE matched.
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        with self.transaction():
+            for sql, params in statements:
+                try:
+                    cursor.execute(sql, params)
+                    results.append(cursor.rowcount if cursor.description is None else cursor.fetchall())
+                except sqlite3.Error as exc:
+                    if not self.conn.in_transaction:
+                        # SQLite rolled the whole transaction back (e.g. SQLITE_FULL/IOERR); later
+                        # statements would run in autocommit, so fail the batch as a unit.
+                        raise
+                    results.append(exc)
+        return results
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block inside BEGIN IMMEDIATE ... COMMIT on the writer connection.
+
+        Not thread-safe: only one thread may use self.conn at a time (__init__ during schema
+        setup, then the DB executor thread).
+        """
+        # Taking the write lock up front avoids SQLITE_BUSY on the deferred read-to-write upgrade.
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+            self.conn.execute("COMMIT")
+        except BaseException:
+            # A failed COMMIT can leave the transaction open; without a rollback every later BEGIN would fail.
+            if self.conn.in_transaction:
+                try:
+                    self.conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+            raise
+
+    async def create_or_refresh_request(self, join_request: ChatJoinRequest, now_ts: float | None = None) -> int:
+        user = join_request.from_user
+        now = int(time.time() if now_ts is None else now_ts)
+
+        params = (
+            join_request.chat.id,
+            user.id,
+            join_request.user_chat_id,
+            user.username,
+            user.first_name,
+            user.last_name,
+            now,
         )
-        self.conn.commit()
-        row = self.conn.execute(
-            "SELECT id FROM join_requests WHERE channel_id = ? AND user_id = ?",
-            (join_request.chat.id, user.id),
-        ).fetchone()
-        if row is None:
+
+        if SQLITE_HAS_RETURNING:
+            rows = await self._write(_SQL_UPSERT_REQUEST_RETURNING_ID, params)
+            request_id = rows[0][0] if rows else None
+        else:
+            await self._write(_SQL_UPSERT_REQUEST, params)
+            request_id = await self._fetchvalue(
+                "SELECT id FROM join_requests WHERE channel_id = ? AND user_id = ?",
+                (join_request.chat.id, user.id),
+            )
+        if request_id is None:
             raise RuntimeError("Failed to save join request")
-        return int(row["id"])
+        return int(request_id)
 
-    def set_risk_profile(
+    async def set_risk_profile(
         self,
         request_id: int,
         estimated_age_days: int,
         risk_score: int,
         reasons: list[str],
     ) -> None:
-        self.conn.execute(
+        await self._write(
             """
             UPDATE join_requests
             SET estimated_age_days = ?,
@@ -240,10 +565,9 @@ class Storage:
             """,
             (estimated_age_days, risk_score, serialize_risk_reasons(reasons), request_id),
         )
-        self.conn.commit()
 
-    def mark_pending_admin(self, request_id: int, reason: str) -> None:
-        self.conn.execute(
+    async def mark_pending_admin(self, request_id: int, reason: str) -> None:
+        await self._write(
             """
             UPDATE join_requests
             SET status = 'pending_admin',
@@ -253,9 +577,8 @@ class Storage:
             """,
             (reason, request_id),
         )
-        self.conn.commit()
 
-    def mark_pending_captcha(
+    async def mark_pending_captcha(
         self,
         request_id: int,
         question: str,
@@ -263,7 +586,7 @@ class Storage:
         max_attempts: int,
         difficulty: str,
     ) -> None:
-        self.conn.execute(
+        await self._write(
             """
             UPDATE join_requests
             SET status = 'pending_captcha',
@@ -278,10 +601,9 @@ class Storage:
             """,
             (difficulty, question, answer, max_attempts, difficulty, request_id),
         )
-        self.conn.commit()
 
-    def refresh_captcha(self, request_id: int, question: str, answer: str) -> None:
-        self.conn.execute(
+    async def refresh_captcha(self, request_id: int, question: str, answer: str) -> None:
+        await self._write(
             """
             UPDATE join_requests
             SET captcha_question = ?,
@@ -290,35 +612,117 @@ class Storage:
             """,
             (question, answer, request_id),
         )
-        self.conn.commit()
 
-    def get_pending_captcha_by_user(self, user_id: int) -> sqlite3.Row | None:
-        return self.conn.execute(
+    async def fail_and_refresh_captcha(self, request_id: int, question: str, answer: str) -> int | None:
+        if not SQLITE_HAS_RETURNING:
+            attempts = await self.increment_captcha_attempts(request_id)
+            if attempts is not None:
+                await self.refresh_captcha(request_id, question, answer)
+            return attempts
+
+        rows = await self._write(
             """
-            SELECT *
-            FROM join_requests
-            WHERE user_id = ?
-              AND status = 'pending_captcha'
-            ORDER BY submitted_at DESC
-            LIMIT 1
+            UPDATE join_requests
+            SET captcha_attempts = captcha_attempts + 1,
+                captcha_question = ?,
+                captcha_answer = ?
+            WHERE id = ? AND status = 'pending_captcha'
+            RETURNING captcha_attempts
             """,
-            (user_id,),
-        ).fetchone()
+            (question, answer, request_id),
+        )
+        return int(rows[0][0]) if rows else None
+
+    async def claim_pending_admin(self, request_id: int) -> JoinRequestRecord | None:
+        return await self._claim(_CLAIM_PENDING_ADMIN, (request_id,))
+
+    async def claim_pending_captcha(self, request_id: int, user_id: int) -> JoinRequestRecord | None:
+        return await self._claim(_CLAIM_PENDING_CAPTCHA, (request_id, user_id))
 
-    def increment_captcha_attempts(self, request_id: int) -> int:
-        self.conn.execute(
-            "UPDATE join_requests SET captcha_attempts = captcha_attempts + 1 WHERE id = ?",
-            (request_id,),
+    async def _claim(self, claim: ClaimStatements, params: tuple) -> JoinRequestRecord | None:
+        """Atomically move a matching request to 'processing' and return it, or None if it no longer matches."""
+        if SQLITE_HAS_RETURNING:
+            rows = await self._write(claim.update_returning, params)
+            return JoinRequestRecord(*rows[0]) if rows else None
+
+        record = await self._fetch_record(claim.select, params)
+        if record is None:
+            return None
+        # Another claim may have won between the SELECT and the UPDATE; only the one that changed the row owns it.
+        updated = await self._write(claim.update, params)
+        return record if updated == 1 else None
+
+    async def release_claim(self, request_id: int, status: str) -> None:
+        await self._write(
+            "UPDATE join_requests SET status = ? WHERE id = ? AND status = 'processing'",
+            (status, request_id),
         )
-        self.conn.commit()
-        row = self.conn.execute("SELECT captcha_attempts FROM join_requests WHERE id = ?", (request_id,)).fetchone()
-        if row is None:
-            raise RuntimeError("Request not found while incrementing attempts")
-        return int(row["captcha_attempts"])
-
-    def complete(self, request_id: int, status: str, decision_by: int | None, reason: str) -> None:
-        now = int(datetime.now(tz=timezone.utc).timestamp())
-        self.conn.execute(
+
+    async def get_pending_captcha_by_user(self, user_id: int) -> PendingCaptcha | None:
+        return await self._read(self._get_pending_captcha_by_user, user_id)
+
+    def _get_pending_captcha_by_user(self, user_id: int) -> PendingCaptcha | None:
+        cursor = self._read_conn().cursor()
+        cursor.row_factory = None
+        row = cursor.execute(_SQL_PENDING_CAPTCHA_BY_USER, (user_id,)).fetchone()
+        return None if row is None else PendingCaptcha._make(row)
+
+    async def increment_captcha_attempts(self, request_id: int) -> int | None:
+        """Count a failed answer; returns None when the request is no longer waiting for a captcha."""
+        if SQLITE_HAS_RETURNING:
+            rows = await self._write(
+                """
+                UPDATE join_requests
+                SET captcha_attempts = captcha_attempts + 1
+                WHERE id = ? AND status = 'pending_captcha'
+                RETURNING captcha_attempts
+                """,
+                (request_id,),
+            )
+            attempts = rows[0][0] if rows else None
+        else:
+            await self._write(
+                "UPDATE join_requests SET captcha_attempts = captcha_attempts + 1 WHERE id = ? AND status = 'pending_captcha'",
+                (request_id,),
+            )
+            attempts = await self._fetchvalue(
+                "SELECT captcha_attempts FROM join_requests WHERE id = ? AND status = 'pending_captcha'",
+                (request_id,),
+            )
+        return None if attempts is None else int(attempts)
+
+    async def complete(
+        self,
+        request_id: int,
+        status: str,
+        decision_by: int | None,
+        reason: str,
+        now_ts: float | None = None,
+    ) -> None:
+        await self._enqueue_complete(request_id, status, decision_by, reason, now_ts)
+
+    def complete_nowait(
+        self,
+        request_id: int,
+        status: str,
+        decision_by: int | None,
+        reason: str,
+        now_ts: float | None = None,
+    ) -> None:
+        """Queue the final status update without waiting for its commit; a failed write is logged."""
+        future = self._enqueue_complete(request_id, status, decision_by, reason, now_ts)
+        future.add_done_callback(_log_failed_write)
+
+    def _enqueue_complete(
+        self,
+        request_id: int,
+        status: str,
+        decision_by: int | None,
+        reason: str,
+        now_ts: float | None,
+    ) -> asyncio.Future:
+        now = int(time.time() if now_ts is None else now_ts)
+        return self.enqueue(
             """
             UPDATE join_requests
             SET status = ?,
@@ -329,35 +733,33 @@ class Storage:
             """,
             (status, decision_by, now, reason, request_id),
         )
-        self.conn.commit()
 
-    def get(self, request_id: int) -> sqlite3.Row | None:
-        return self.conn.execute("SELECT * FROM join_requests WHERE id = ?", (request_id,)).fetchone()
+    async def get(self, request_id: int) -> JoinRequestRecord | None:
+        return await self._fetch_record(_SQL_REQUEST_BY_ID, (request_id,))
 
-    def list_pending_admin(self, limit: int = 10) -> list[sqlite3.Row]:
-        return self.conn.execute(
-            """
-            SELECT * FROM join_requests
-            WHERE status = 'pending_admin'
-            ORDER BY submitted_at ASC
-            LIMIT ?
-            """,
-            (limit,),
-        ).fetchall()
+    async def list_pending_admin(self, limit: int = 10) -> list[JoinRequestRecord]:
+        return await self._read(self._list_pending_admin, limit)
 
-    def list_recent_decisions(self, limit: int = 10) -> list[sqlite3.Row]:
-        return self.conn.execute(
-            """
-            SELECT * FROM join_requests
-            WHERE decision_at IS NOT NULL
-            ORDER BY decision_at DESC
-            LIMIT ?
-            """,
-            (limit,),
-        ).fetchall()
+    async def list_recent_decisions(self, limit: int = 10) -> list[JoinRequestRecord]:
+        return await self._read(self._list_recent_decisions, limit)
+
+    async def get_status_stats(self, since_ts: int) -> dict[str, int]:
+        return await self._read(self._get_status_stats, since_ts)
+
+    async def snapshot_for_panel(self, since_ts: int, pending_limit: int, recent_limit: int) -> PanelSnapshot:
+        return await self._read(self._snapshot_for_panel, since_ts, pending_limit, recent_limit)
 
-    def get_status_stats(self, since_ts: int) -> dict[str, int]:
-        rows = self.conn.execute(
+    async def get_setting(self, key: str) -> str | None:
+        return await self._read(self._get_setting, key)
+
+    def _list_pending_admin(self, limit: int) -> list[JoinRequestRecord]:
+        return self._execute_fetch_records(_SQL_LIST_PENDING_ADMIN, (limit,))
+
+    def _list_recent_decisions(self, limit: int) -> list[JoinRequestRecord]:
+        return self._execute_fetch_records(_SQL_LIST_RECENT_DECISIONS, (limit,))
+
+    def _get_status_stats(self, since_ts: int) -> dict[str, int]:
+        rows = self._read_conn().execute(
             """
             SELECT status, COUNT(*) AS cnt
             FROM join_requests
@@ -371,57 +773,84 @@ class Storage:
             stats[str(row["status"])] = int(row["cnt"])
         return stats
 
-    def get_setting(self, key: str) -> str | None:
-        row = self.conn.execute("SELECT value FROM bot_settings WHERE key = ?", (key,)).fetchone()
-        if row is None:
+    def _snapshot_for_panel(self, since_ts: int, pending_limit: int, recent_limit: int) -> PanelSnapshot:
+        # One read transaction pins a WAL snapshot, so no write can land between the reads.
+        conn = self._read_conn()
+        conn.execute("BEGIN")
+        try:
+            return PanelSnapshot(
+                mode=self._get_moderation_mode(),
+                stats=self._get_status_stats(since_ts),
+                recent=self._list_recent_decisions(recent_limit),
+                pending=self._list_pending_admin(pending_limit),
+            )
+        finally:
+            conn.execute("COMMIT")
+
+    def _get_setting(self, key: str) -> str | None:
+        value = self._execute_fetchvalue("SELECT value FROM bot_settings WHERE key = ?", (key,))
+        if value is None:
             return None
-        return str(row["value"])
+        return str(value)
 
-    def set_setting(self, key: str, value: str) -> None:
-        self.conn.execute(
+    async def set_setting(self, key: str, value: str) -> None:
+        await self._write(
             """
             INSERT INTO bot_settings(key, value) VALUES (?, ?)
             ON CONFLICT(key) DO UPDATE SET value = excluded.value
             """,
             (key, value),
         )
-        self.conn.commit()
 
-    def get_moderation_mode(self) -> str:
-        value = self.get_setting("moderation_mode")
+    async def get_moderation_mode(self) -> str:
+        return await self._read(self._get_moderation_mode)
+
+    def _get_moderation_mode(self) -> str:
+        value = self._get_setting("moderation_mode")
         if value not in {"hybrid", "manual"}:
             return "hybrid"
         return value
 
-    def set_moderation_mode(self, mode: str) -> None:
+    async def set_moderation_mode(self, mode: str) -> None:
         if mode not in {"hybrid", "manual"}:
             raise ValueError("Unsupported moderation mode")
-        self.set_setting("moderation_mode", mode)
+        await self.set_setting("moderation_mode", mode)
 
-    def close(self) -> None:
-        self.conn.close()
+    async def close(self) -> None:
+        if self._writer_task is not None:
+            await self._write_queue.join()
+            self._writer_task.cancel()
+            self._writer_task = None
+        self._read_executor.shutdown(wait=True)
+        for conn in self._read_conns:
+            conn.close()
+        await self._run(self.conn.execute, "PRAGMA optimize")
+        await self._run(self.conn.close)
+        self._db_executor.shutdown(wait=True)
+
+
+def estimate_created_ts_from_user_id(user_id: int) -> float:
+    if user_id <= _ANCHOR_IDS[0]:
+        return _ANCHOR_TS[0]
+    if user_id >= _ANCHOR_IDS[-1]:
+        return _ANCHOR_TS[-1]
+
+    index = bisect_right(_ANCHOR_IDS, user_id) - 1
+    left_id = _ANCHOR_IDS[index]
+    left_ts = _ANCHOR_TS[index]
+    ratio = (user_id - left_id) / (_ANCHOR_IDS[index + 1] - left_id)
+    return left_ts + ratio * (_ANCHOR_TS[index + 1] - left_ts)
 
 
 def estimate_created_at_from_user_id(user_id: int) -> datetime:
-    if user_id <= ID_DATE_ANCHORS[0][0]:
-        return ID_DATE_ANCHORS[0][1]
-
-    for index in range(len(ID_DATE_ANCHORS) - 1):
-        left_id, left_date = ID_DATE_ANCHORS[index]
-        right_id, right_date = ID_DATE_ANCHORS[index + 1]
-        if left_id <= user_id <= right_id:
-            ratio = (user_id - left_id) / (right_id - left_id)
-            left_ts = left_date.timestamp()
-            right_ts = right_date.timestamp()
-            current_ts = left_ts + ratio * (right_ts - left_ts)
-            return datetime.fromtimestamp(current_ts, tz=timezone.utc)
+    return datetime.fromtimestamp(estimate_created_ts_from_user_id(user_id), tz=timezone.utc)
 
-    return ID_DATE_ANCHORS[-1][1]
 
-
-def estimate_account_age_days(user_id: int) -> int:
-    created_at = estimate_created_at_from_user_id(user_id)
-    age_days = (datetime.now(tz=timezone.utc) - created_at).days
+def estimate_account_age_days(user_id: int, now_ts: float | None = None) -> int:
+    created_ts = estimate_created_ts_from_user_id(user_id)
+    if now_ts is None:
+        now_ts = time.time()
+    age_days = int((now_ts - created_ts) / 86400)
     return max(0, age_days)
 
 
@@ -432,11 +861,19 @@ class RiskAssessment:
     reasons: list[str]
 
 
-SPAM_BIO_PATTERN = re.compile(
-    r"(t\.me/|telegram\.me/|https?://|airdrop|crypto|profit|casino|scommesse|pump|guadagno)",
-    flags=re.IGNORECASE,
+SPAM_BIO_TOKENS = (
+    "t.me/",
+    "telegram.me/",
+    "http://",
+    "https://",
+    "airdrop",
+    "crypto",
+    "profit",
+    "casino",
+    "scommesse",
+    "pump",
+    "guadagno",
 )
-SUSPICIOUS_NAME_PATTERN = re.compile(r"(\d{4,}|(.)\2{3,})")
 
 
 def name_looks_suspicious(user: User) -> bool:
@@ -444,23 +881,52 @@ def name_looks_suspicious(user: User) -> bool:
     compact = full_name.replace(" ", "")
     if len(compact) < 4:
         return True
-    return bool(SUSPICIOUS_NAME_PATTERN.search(compact))
+    return has_suspicious_run(compact)
+
+
+def has_suspicious_run(text: str) -> bool:
+    # Four or more digits in a row, or the same character four or more times in a row.
+    digit_run = 0
+    same_run = 0
+    previous = ""
+    for char in text:
+        same_run = same_run + 1 if char == previous else 1
+        digit_run = digit_run + 1 if char.isdecimal() else 0
+        if same_run >= 4 or digit_run >= 4:
+            return True
+        previous = char
+    return False
+
+
+def bio_has_spam(bio: str) -> bool:
+    lowered = bio.lower()
+    return any(token in lowered for token in SPAM_BIO_TOKENS)
+
+
+RISK_REASONS_SEPARATOR = "\x1f"
 
 
 def serialize_risk_reasons(reasons: list[str]) -> str:
-    return json.dumps(reasons, ensure_ascii=False)
+    return RISK_REASONS_SEPARATOR.join(reasons)
 
 
 def deserialize_risk_reasons(raw: str | None) -> list[str]:
     if not raw:
         return []
-    try:
-        parsed = json.loads(raw)
-        if isinstance(parsed, list):
-            return [str(item) for item in parsed]
-    except json.JSONDecodeError:
-        return [raw]
-    return [raw]
+    # Rows written before the separator format stored a JSON list.
+    if raw.startswith("["):
+        try:
+            parsed = json.loads(raw)
+            if isinstance(parsed, list):
+                return [str(item) for item in parsed]
+        except json.JSONDecodeError:
+            pass
+    return raw.split(RISK_REASONS_SEPARATOR)
+
+
+def format_utc_minute(ts: int) -> str:
+    tm = time.gmtime(ts)
+    return f"{tm.tm_year:04d}-{tm.tm_mon:02d}-{tm.tm_mday:02d} {tm.tm_hour:02d}:{tm.tm_min:02d} UTC"
 
 
 def build_risk_summary(score: int, reasons: list[str]) -> str:
@@ -512,23 +978,22 @@ def build_captcha_image(answer: str, difficulty: str) -> bytes:
     image = Image.new("RGB", (width, height), (244, 248, 252))
     draw = ImageDraw.Draw(image)
 
+    # Noise parameters are drawn in bulk instead of one randint() call per value.
     line_count = 30 if difficulty == "hard" else 20
-    for _ in range(line_count):
-        start = (random.randint(0, width), random.randint(0, height))
-        end = (random.randint(0, width), random.randint(0, height))
-        color = (
-            random.randint(90, 170),
-            random.randint(90, 170),
-            random.randint(90, 170),
-        )
-        draw.line([start, end], fill=color, width=random.randint(1, 2))
+    line_xs = random.choices(range(width + 1), k=line_count * 2)
+    line_ys = random.choices(range(height + 1), k=line_count * 2)
+    line_colors = zip(*(random.choices(range(90, 171), k=line_count) for _ in range(3)))
+    line_widths = random.choices((1, 2), k=line_count)
+    for index, (color, line_width) in enumerate(zip(line_colors, line_widths)):
+        start = (line_xs[2 * index], line_ys[2 * index])
+        end = (line_xs[2 * index + 1], line_ys[2 * index + 1])
+        draw.line([start, end], fill=color, width=line_width)
 
     dot_count = 1700 if difficulty == "hard" else 1100
-    for _ in range(dot_count):
-        draw.point(
-            (random.randint(0, width - 1), random.randint(0, height - 1)),
-            fill=(random.randint(120, 220), random.randint(120, 220), random.randint(120, 220)),
-        )
+    dot_points = zip(random.choices(range(width), k=dot_count), random.choices(range(height), k=dot_count))
+    dot_colors = zip(*(random.choices(range(120, 221), k=dot_count) for _ in range(3)))
+    for point, color in zip(dot_points, dot_colors):
+        draw.point(point, fill=color)
 
     font_size = 54 if difficulty == "hard" else 50
     font = load_captcha_font(font_size)
@@ -536,19 +1001,19 @@ def build_captcha_image(answer: str, difficulty: str) -> bytes:
     y_base = 24
     resample_mode = Image.Resampling.BICUBIC if hasattr(Image, "Resampling") else Image.BICUBIC
 
-    for index, symbol in enumerate(answer):
+    glyph_count = len(answer)
+    glyph_colors = zip(*(random.choices(range(10, 81), k=glyph_count) for _ in range(3)), (255,) * glyph_count)
+    glyph_angles = random.choices(range(-35, 36), k=glyph_count)
+    x_offsets = random.choices(range(-8, 9), k=glyph_count)
+    y_offsets = random.choices(range(-10, 11), k=glyph_count)
+    glyphs = zip(answer, glyph_colors, glyph_angles, x_offsets, y_offsets)
+    for index, (symbol, glyph_color, angle, x_offset, y_offset) in enumerate(glyphs):
         glyph = Image.new("RGBA", (80, 100), (0, 0, 0, 0))
         glyph_draw = ImageDraw.Draw(glyph)
-        glyph_color = (
-            random.randint(10, 80),
-            random.randint(10, 80),
-            random.randint(10, 80),
-            255,
-        )
         glyph_draw.text((12, 12), symbol, font=font, fill=glyph_color)
-        rotated = glyph.rotate(random.randint(-35, 35), resample=resample_mode, expand=True)
-        x = slot_width * (index + 1) - 20 + random.randint(-8, 8)
-        y = y_base + random.randint(-10, 10)
+        rotated = glyph.rotate(angle, resample=resample_mode, expand=True)
+        x = slot_width * (index + 1) - 20 + x_offset
+        y = y_base + y_offset
         image.paste(rotated, (x, y), rotated)
 
     image = image.filter(ImageFilter.GaussianBlur(radius=0.8 if difficulty == "hard" else 0.45))
@@ -560,12 +1025,17 @@ def build_captcha_image(answer: str, difficulty: str) -> bytes:
 
 def generate_captcha(difficulty: str = "normal") -> CaptchaChallenge:
     length = 6 if difficulty == "hard" else 5
-    answer = "".join(random.choice(CAPTCHA_ALPHABET) for _ in range(length))
+    answer = "".join(random.choices(CAPTCHA_ALPHABET, k=length))
     prompt = "Scrivi i simboli che vedi nell'immagine. Usa solo lettere maiuscole e numeri."
     image_bytes = build_captcha_image(answer=answer, difficulty=difficulty)
     return CaptchaChallenge(prompt=prompt, answer=normalize_captcha_answer(answer), image_bytes=image_bytes)
 
 
+# Pre-rendered captchas per difficulty; the pools are refilled in worker threads.
+CAPTCHA_POOL_SIZES = {"normal": 256, "hard": 128}
+
+
+@lru_cache(maxsize=1024)
 def build_admin_keyboard(request_id: int) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
@@ -577,6 +1047,13 @@ def build_admin_keyboard(request_id: int) -> InlineKeyboardMarkup:
     )
 
 
+@lru_cache(maxsize=1024)
+def build_admin_keyboard_json(request_id: int) -> str:
+    # The session sends string fields as-is, so a pre-serialized markup skips per-recipient dumping.
+    return build_admin_keyboard(request_id).model_dump_json(exclude_none=True)
+
+
+@lru_cache(maxsize=2)
 def build_admin_menu_keyboard(mode: str) -> InlineKeyboardMarkup:
     mode_label = "Manuale" if mode == "manual" else "Ibrido"
     return InlineKeyboardMarkup(
@@ -593,45 +1070,161 @@ def build_admin_menu_keyboard(mode: str) -> InlineKeyboardMarkup:
     )
 
 
-def build_pending_actions_keyboard(requests: list[sqlite3.Row], mode: str) -> InlineKeyboardMarkup:
-    rows: list[list[InlineKeyboardButton]] = []
-    for request in requests:
-        request_id = int(request["id"])
-        rows.append(
-            [
-                InlineKeyboardButton(text=f"Approva #{request_id}", callback_data=f"adm:approve:{request_id}"),
-                InlineKeyboardButton(text=f"Rifiuta #{request_id}", callback_data=f"adm:decline:{request_id}"),
-            ]
-        )
-    rows.append(
-        [
+@lru_cache(maxsize=2)
+def build_pending_footer_rows(mode: str) -> tuple[tuple[InlineKeyboardButton, ...], ...]:
+    return (
+        (
             InlineKeyboardButton(text="Aggiorna", callback_data="panel:pending"),
             InlineKeyboardButton(text="Dashboard", callback_data="panel:dashboard"),
-        ]
-    )
-    rows.append(
-        [
+        ),
+        (
             InlineKeyboardButton(
                 text=f"Modo: {'Manuale' if mode == 'manual' else 'Ibrido'}",
                 callback_data="panel:toggle_mode",
-            )
-        ]
+            ),
+        ),
     )
+
+
+def build_pending_actions_keyboard(requests: list[JoinRequestRecord], mode: str) -> InlineKeyboardMarkup:
+    rows = [
+        [
+            InlineKeyboardButton(text=f"Approva #{request_id}", callback_data=f"adm:approve:{request_id}"),
+            InlineKeyboardButton(text=f"Rifiuta #{request_id}", callback_data=f"adm:decline:{request_id}"),
+        ]
+        for request_id in (request.id for request in requests)
+    ]
+    rows.extend(list(row) for row in build_pending_footer_rows(mode))
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+PROFILE_PROBE_TTL_SECONDS = 300
+PROFILE_PROBE_CACHE_SIZE = 10_000
+PANEL_SNAPSHOT_TTL_SECONDS = 5
+CHANNEL_TEXT_TTL_SECONDS = 10
+PANEL_CACHE_SIZE = 16
+
+
+def ttl_cache_get(cache: dict, key, ttl: float) -> tuple[bool, object]:
+    entry = cache.get(key)
+    if entry is None or time.monotonic() - entry[0] >= ttl:
+        return False, None
+    return True, entry[1]
+
+
+def ttl_cache_put(cache: dict, key, value, max_size: int) -> None:
+    cache.pop(key, None)
+    if len(cache) >= max_size:
+        # Dicts keep insertion order, so the first key is the oldest entry.
+        cache.pop(next(iter(cache)))
+    cache[key] = (time.monotonic(), value)
+
+
+TELEGRAM_GLOBAL_RATE_PER_SECOND = 30
+TELEGRAM_CHAT_RATE_PER_SECOND = 1
+# Short bursts (e.g. a status message followed by the captcha photo) are tolerated by Telegram.
+TELEGRAM_CHAT_BURST = 3
+TELEGRAM_GROUP_RATE_PER_MINUTE = 20
+TELEGRAM_RETRY_AFTER_ATTEMPTS = 3
+RATE_LIMITED_METHODS = (SendMessage, SendPhoto, EditMessageText, EditMessageReplyMarkup)
+# Edits only count against the global bucket; the per-chat limit is about new messages.
+CHAT_LIMITED_METHODS = (SendMessage, SendPhoto)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class TelegramRateLimiter(BaseRequestMiddleware):
+    """Client-side throttle for outgoing messages: a global bucket plus one bucket per chat.
+
+    Private chats allow a short burst at ~1 msg/s; group and channel chats (negative ids) are
+    capped at 20 messages per minute. Edits are only charged to the global bucket.
+    """
+
+    MAX_CHAT_BUCKETS = 10_000
+
+    def __init__(self) -> None:
+        self._global = TokenBucket(TELEGRAM_GLOBAL_RATE_PER_SECOND, TELEGRAM_GLOBAL_RATE_PER_SECOND)
+        self._chats: dict[int, TokenBucket] = {}
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self.MAX_CHAT_BUCKETS:
+                self._drop_idle_buckets()
+            if chat_id < 0:
+                # No burst allowance: one message every 3 s satisfies both the 1/s and 20/min limits.
+                bucket = TokenBucket(TELEGRAM_GROUP_RATE_PER_MINUTE / 60, 1)
+            else:
+                bucket = TokenBucket(TELEGRAM_CHAT_RATE_PER_SECOND, TELEGRAM_CHAT_BURST)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _drop_idle_buckets(self) -> None:
+        now = time.monotonic()
+        for chat_id, bucket in list(self._chats.items()):
+            if bucket.tokens + (now - bucket.updated_at) * bucket.rate >= bucket.capacity:
+                del self._chats[chat_id]
+
+    async def acquire(self, chat_id: int | str | None) -> None:
+        delay = self._global.reserve()
+        if isinstance(chat_id, int):
+            delay = max(delay, self._chat_bucket(chat_id).reserve())
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def __call__(self, make_request, bot: Bot, method):
+        if not isinstance(method, RATE_LIMITED_METHODS):
+            return await make_request(bot, method)
+
+        for attempt in range(TELEGRAM_RETRY_AFTER_ATTEMPTS):
+            chat_id = getattr(method, "chat_id", None) if isinstance(method, CHAT_LIMITED_METHODS) else None
+            await self.acquire(chat_id)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as exc:
+                if attempt == TELEGRAM_RETRY_AFTER_ATTEMPTS - 1:
+                    raise
+                logging.warning(
+                    "flood_wait method=%s retry_after=%s attempt=%s",
+                    type(method).__name__,
+                    exc.retry_after,
+                    attempt + 1,
+                )
+                await asyncio.sleep(exc.retry_after)
+
+
+ADMIN_CALLBACK_ACTIONS = frozenset({"approve", "decline"})
+PANEL_CALLBACK_ACTIONS = frozenset({"dashboard", "pending", "channel", "toggle_mode"})
+
+
 def parse_admin_callback(data: str) -> tuple[str, int] | None:
-    parts = data.split(":")
-    if len(parts) != 3:
+    prefix, _, rest = data.partition(":")
+    if prefix != "adm":
         return None
-    if parts[0] != "adm":
-        return None
-    action = parts[1]
-    if action not in {"approve", "decline"}:
+    action, _, raw_request_id = rest.partition(":")
+    if action not in ADMIN_CALLBACK_ACTIONS:
         return None
 
     try:
-        request_id = int(parts[2])
+        request_id = int(raw_request_id)
     except ValueError:
         return None
 
@@ -639,23 +1232,55 @@ def parse_admin_callback(data: str) -> tuple[str, int] | None:
 
 
 def parse_panel_callback(data: str) -> str | None:
-    parts = data.split(":")
-    if len(parts) != 2:
-        return None
-    if parts[0] != "panel":
+    prefix, _, action = data.partition(":")
+    if prefix != "panel":
         return None
-    action = parts[1]
-    if action not in {"dashboard", "pending", "channel", "toggle_mode"}:
+    if action not in PANEL_CALLBACK_ACTIONS:
         return None
     return action
 
 
 class JoinGuardBot:
+    __slots__ = (
+        "settings",
+        "storage",
+        "bot",
+        "dp",
+        "_admin_ids",
+        "_channel_id",
+        "_risk_admin",
+        "_risk_hard",
+        "_photo_cache",
+        "_bio_cache",
+        "_admin_sem",
+        "_panel_cache",
+        "_captcha_pool",
+        "_captcha_refill_tasks",
+        "_captcha_locks",
+        "_admin_delivery_failures",
+    )
+
     def __init__(self, settings: Settings) -> None:
         self.settings = settings
+        self._admin_ids = settings.admin_ids
+        self._channel_id = settings.channel_id
+        self._risk_admin = settings.risk_score_to_admin
+        self._risk_hard = settings.risk_score_to_hard_captcha
+        self._admin_sem = asyncio.Semaphore(settings.admin_fanout_concurrency)
         self.storage = Storage(settings.db_path)
-        self.bot = Bot(settings.bot_token)
+        self.bot = Bot(settings.bot_token, session=AiohttpSession(limit=settings.http_pool_limit))
+        self.bot.session.middleware(TelegramRateLimiter())
         self.dp = Dispatcher()
+        self._photo_cache: dict[int, tuple[float, bool | None]] = {}
+        self._bio_cache: dict[int, tuple[float, str | None]] = {}
+        self._panel_cache: dict[str, tuple[float, object]] = {}
+        self._captcha_pool: dict[str, asyncio.Queue[CaptchaChallenge]] = {
+            difficulty: asyncio.Queue(maxsize=size) for difficulty, size in CAPTCHA_POOL_SIZES.items()
+        }
+        self._captcha_refill_tasks: list[asyncio.Task[None]] = []
+        # Entries disappear once no handler holds the lock any more.
+        self._captcha_locks: weakref.WeakValueDictionary[int, asyncio.Lock] = weakref.WeakValueDictionary()
+        self._admin_delivery_failures: Counter[int] = Counter()
         self._register_handlers()
 
     def _register_handlers(self) -> None:
@@ -671,7 +1296,20 @@ class JoinGuardBot:
         self.dp.callback_query.register(self.on_panel_callback, F.data.startswith("panel:"))
 
     def _is_admin(self, user_id: int | None) -> bool:
-        return user_id is not None and user_id in self.settings.admin_ids
+        return user_id in self._admin_ids
+
+    async def _refill_captchas(self, difficulty: str) -> None:
+        pool = self._captcha_pool[difficulty]
+        while True:
+            challenge = await asyncio.to_thread(generate_captcha, difficulty)
+            await pool.put(challenge)
+
+    async def _next_captcha(self, difficulty: str) -> CaptchaChallenge:
+        pool = self._captcha_pool.get(difficulty)
+        if pool is not None and not pool.empty():
+            return pool.get_nowait()
+        # Pool drained (or not started yet): render on demand, still off the event loop.
+        return await asyncio.to_thread(generate_captcha, difficulty)
 
     async def on_start(self, message: Message) -> None:
         if self._is_admin(message.from_user.id if message.from_user else None):
@@ -686,30 +1324,32 @@ class JoinGuardBot:
         if not self._is_admin(message.from_user.id if message.from_user else None):
             await message.answer("Non hai i permessi admin.")
             return
-        mode = self.storage.get_moderation_mode()
-        await message.answer(self._build_dashboard_text(), reply_markup=build_admin_menu_keyboard(mode))
+        snapshot = await self._load_panel_snapshot()
+        await message.answer(self._build_dashboard_text(snapshot), reply_markup=build_admin_menu_keyboard(snapshot.mode))
 
     async def on_stats_command(self, message: Message) -> None:
         if not self._is_admin(message.from_user.id if message.from_user else None):
             await message.answer("Non hai i permessi admin.")
             return
-        mode = self.storage.get_moderation_mode()
-        await message.answer(self._build_dashboard_text(), reply_markup=build_admin_menu_keyboard(mode))
+        snapshot = await self._load_panel_snapshot()
+        await message.answer(self._build_dashboard_text(snapshot), reply_markup=build_admin_menu_keyboard(snapshot.mode))
 
     async def on_pending_command(self, message: Message) -> None:
         if not self._is_admin(message.from_user.id if message.from_user else None):
             await message.answer("Non hai i permessi admin.")
             return
-        pending = self.storage.list_pending_admin(limit=8)
-        mode = self.storage.get_moderation_mode()
-        await message.answer(self._build_pending_text(pending), reply_markup=build_pending_actions_keyboard(pending, mode))
+        snapshot = await self._load_panel_snapshot()
+        await message.answer(
+            self._build_pending_text(snapshot.pending),
+            reply_markup=build_pending_actions_keyboard(snapshot.pending, snapshot.mode),
+        )
 
     async def on_channel_command(self, message: Message) -> None:
         if not self._is_admin(message.from_user.id if message.from_user else None):
             await message.answer("Non hai i permessi admin.")
             return
-        mode = self.storage.get_moderation_mode()
-        await message.answer(await self._build_channel_text(), reply_markup=build_admin_menu_keyboard(mode))
+        mode = await self.storage.get_moderation_mode()
+        await message.answer(await self._build_channel_text(mode), reply_markup=build_admin_menu_keyboard(mode))
 
     async def on_panel_callback(self, callback: CallbackQuery) -> None:
         if not callback.data:
@@ -725,9 +1365,10 @@ class JoinGuardBot:
             return
 
         if action == "toggle_mode":
-            current_mode = self.storage.get_moderation_mode()
+            current_mode = await self.storage.get_moderation_mode()
             next_mode = "manual" if current_mode == "hybrid" else "hybrid"
-            self.storage.set_moderation_mode(next_mode)
+            await self.storage.set_moderation_mode(next_mode)
+            self._invalidate_panel_cache()
             logging.info("moderation_mode_changed by=%s mode=%s", callback.from_user.id, next_mode)
             await callback.answer(f"Modo impostato: {next_mode}")
             action = "dashboard"
@@ -737,17 +1378,16 @@ class JoinGuardBot:
         if not callback.message:
             return
 
-        mode = self.storage.get_moderation_mode()
+        snapshot = await self._load_panel_snapshot()
         if action == "dashboard":
-            text = self._build_dashboard_text()
-            markup = build_admin_menu_keyboard(mode)
+            text = self._build_dashboard_text(snapshot)
+            markup = build_admin_menu_keyboard(snapshot.mode)
         elif action == "pending":
-            pending = self.storage.list_pending_admin(limit=8)
-            text = self._build_pending_text(pending)
-            markup = build_pending_actions_keyboard(pending, mode)
+            text = self._build_pending_text(snapshot.pending)
+            markup = build_pending_actions_keyboard(snapshot.pending, snapshot.mode)
         else:
-            text = await self._build_channel_text()
-            markup = build_admin_menu_keyboard(mode)
+            text = await self._build_channel_text(snapshot.mode)
+            markup = build_admin_menu_keyboard(snapshot.mode)
 
         try:
             await callback.message.edit_text(text, reply_markup=markup)
@@ -755,10 +1395,10 @@ class JoinGuardBot:
             if "message is not modified" not in str(exc).lower():
                 raise
 
-    async def assess_risk(self, user: User) -> RiskAssessment:
+    async def assess_risk(self, user: User, now_ts: float | None = None) -> RiskAssessment:
         score = 0
         reasons: list[str] = []
-        estimated_age_days = estimate_account_age_days(user.id)
+        estimated_age_days = estimate_account_age_days(user.id, now_ts)
 
         reasons.append(f"eta_account_stimata={estimated_age_days}g")
         if user.is_bot:
@@ -776,72 +1416,99 @@ class JoinGuardBot:
             score += 2
             reasons.append("nome_sospetto")
 
-        has_photo = await self._has_profile_photo(user.id)
+        if score >= self._risk_admin:
+            # Routing is already decided, the profile probes could only add detail.
+            return RiskAssessment(estimated_age_days=estimated_age_days, score=score, reasons=reasons)
+
+        has_photo, bio = await asyncio.gather(
+            self._has_profile_photo(user.id),
+            self._fetch_user_bio(user.id),
+            return_exceptions=True,
+        )
+        if isinstance(has_photo, Exception):
+            logging.warning("risk_signal_photo_failed user_id=%s err=%s", user.id, str(has_photo))
+            has_photo = None
+        if isinstance(bio, Exception):
+            logging.warning("risk_signal_bio_failed user_id=%s err=%s", user.id, str(bio))
+            bio = None
+
         if has_photo is False:
             score += 2
             reasons.append("foto_profilo_assente")
-
-        bio = await self._fetch_user_bio(user.id)
-        if bio and SPAM_BIO_PATTERN.search(bio):
+        if bio and bio_has_spam(bio):
             score += 3
             reasons.append("bio_con_pattern_spam")
 
         return RiskAssessment(estimated_age_days=estimated_age_days, score=score, reasons=reasons)
 
     async def _has_profile_photo(self, user_id: int) -> bool | None:
+        hit, cached = ttl_cache_get(self._photo_cache, user_id, PROFILE_PROBE_TTL_SECONDS)
+        if hit:
+            return cached
         try:
             photos = await self.bot.get_user_profile_photos(user_id=user_id, limit=1)
-            return photos.total_count > 0
+            has_photo = photos.total_count > 0
         except TelegramBadRequest as exc:
             logging.info("risk_signal_photo_unavailable user_id=%s err=%s", user_id, str(exc))
-            return None
+            has_photo = None
+        ttl_cache_put(self._photo_cache, user_id, has_photo, PROFILE_PROBE_CACHE_SIZE)
+        return has_photo
 
     async def _fetch_user_bio(self, user_id: int) -> str | None:
+        hit, cached = ttl_cache_get(self._bio_cache, user_id, PROFILE_PROBE_TTL_SECONDS)
+        if hit:
+            return cached
+        bio = None
         try:
             user_chat = await self.bot.get_chat(chat_id=user_id)
-            bio = getattr(user_chat, "bio", None)
-            if bio:
-                return str(bio)
+            raw_bio = getattr(user_chat, "bio", None)
+            if raw_bio:
+                bio = str(raw_bio)
         except TelegramBadRequest as exc:
             logging.info("risk_signal_bio_unavailable user_id=%s err=%s", user_id, str(exc))
-        return None
+        ttl_cache_put(self._bio_cache, user_id, bio, PROFILE_PROBE_CACHE_SIZE)
+        return bio
 
     async def on_join_request(self, join_request: ChatJoinRequest) -> None:
-        if join_request.chat.id != self.settings.channel_id:
+        if join_request.chat.id != self._channel_id:
             return
 
-        request_id = self.storage.create_or_refresh_request(join_request)
+        now_ts = time.time()
+        request_id = await self.storage.create_or_refresh_request(join_request, now_ts)
         user = join_request.from_user
-        mode = self.storage.get_moderation_mode()
+        mode = await self.storage.get_moderation_mode()
 
         await self.safe_send_user_message(
             join_request.user_chat_id,
             "La tua richiesta e stata ricevuta. Ora il bot controllera l'account e ti inviera il prossimo passaggio.",
         )
 
-        risk = await self.assess_risk(user)
-        self.storage.set_risk_profile(
+        risk = await self.assess_risk(user, now_ts)
+        await self.storage.set_risk_profile(
             request_id=request_id,
             estimated_age_days=risk.estimated_age_days,
             risk_score=risk.score,
             reasons=risk.reasons,
         )
-        logging.info(
-            "join_request_received request_id=%s user_id=%s channel_id=%s mode=%s %s",
-            request_id,
-            user.id,
-            join_request.chat.id,
-            mode,
-            build_risk_summary(risk.score, risk.reasons),
-        )
+        if logging.root.isEnabledFor(logging.INFO):
+            # build_risk_summary formats eagerly, so skip it when INFO is off.
+            logging.info(
+                "join_request_received request_id=%s user_id=%s channel_id=%s mode=%s %s",
+                request_id,
+                user.id,
+                join_request.chat.id,
+                mode,
+                build_risk_summary(risk.score, risk.reasons),
+            )
 
-        force_admin = mode == "manual" or risk.score >= self.settings.risk_score_to_admin
+        force_admin = mode == "manual" or risk.score >= self._risk_admin
         if force_admin:
             route_reason = "manual_mode" if mode == "manual" else "risk_threshold_admin"
-            self.storage.mark_pending_admin(
+            await self.storage.mark_pending_admin(
                 request_id,
                 f"route={route_reason}; {build_risk_summary(risk.score, risk.reasons)}",
             )
+            self._invalidate_panel_cache()
             await self.notify_admins(join_request, request_id, risk, route_reason)
             await self.safe_send_user_message(
                 join_request.user_chat_id,
@@ -849,10 +1516,10 @@ class JoinGuardBot:
             )
             return
 
-        if risk.score >= self.settings.risk_score_to_hard_captcha:
+        if risk.score >= self._risk_hard:
             max_attempts = min(self.settings.max_captcha_attempts, self.settings.hard_captcha_attempts)
-            challenge = generate_captcha(difficulty="hard")
-            self.storage.mark_pending_captcha(
+            challenge = await self._next_captcha("hard")
+            await self.storage.mark_pending_captcha(
                 request_id=request_id,
                 question=challenge.prompt,
                 answer=challenge.answer,
@@ -870,8 +1537,8 @@ class JoinGuardBot:
             )
             return
 
-        challenge = generate_captcha(difficulty="normal")
-        self.storage.mark_pending_captcha(
+        challenge = await self._next_captcha("normal")
+        await self.storage.mark_pending_captcha(
             request_id=request_id,
             question=challenge.prompt,
             answer=challenge.answer,
@@ -894,40 +1561,74 @@ class JoinGuardBot:
         if message.text.startswith("/"):
             return
 
-        request = self.storage.get_pending_captcha_by_user(message.from_user.id)
+        # Serialize answers from the same user so a double send cannot count two attempts at once.
+        user_id = message.from_user.id
+        lock = self._captcha_locks.get(user_id)
+        if lock is None:
+            lock = self._captcha_locks[user_id] = asyncio.Lock()
+        async with lock:
+            await self._handle_captcha_answer(message)
+
+    async def _handle_captcha_answer(self, message: Message) -> None:
+        request = await self.storage.get_pending_captcha_by_user(message.from_user.id)
         if request is None:
             return
 
-        request_id = int(request["id"])
-        max_attempts = int(request["captcha_max_attempts"] or self.settings.max_captcha_attempts)
-        captcha_difficulty = str(request["captcha_difficulty"] or "normal")
-        expected_answer = normalize_captcha_answer(str(request["captcha_answer"] or ""))
+        (
+            request_id,
+            _,
+            _,
+            user_chat_id,
+            captcha_answer,
+            captcha_attempts,
+            max_attempts,
+            captcha_difficulty,
+        ) = request
+        expected_answer = normalize_captcha_answer(str(captcha_answer or ""))
         user_answer = normalize_captcha_answer(message.text)
 
         if user_answer == expected_answer:
-            approved = await self.try_approve_request(request)
+            if await self.storage.claim_pending_captcha(request_id, message.from_user.id) is None:
+                return
+            try:
+                approved = await self.try_approve_request(request)
+            except BaseException:
+                # Network/server errors must not leave the request stuck in 'processing'.
+                await self.storage.release_claim(request_id, "pending_captcha")
+                raise
             if approved:
-                self.storage.complete(request_id, "approved", None, f"captcha_passed:{captcha_difficulty}")
+                self.storage.complete_nowait(request_id, "approved", None, f"captcha_passed:{captcha_difficulty}")
                 await message.answer("Captcha superato. Richiesta approvata, accesso al canale aperto.")
             else:
+                await self.storage.release_claim(request_id, "pending_captcha")
                 await message.answer("Impossibile approvare la richiesta, riprova piu tardi.")
             return
 
-        attempts = self.storage.increment_captcha_attempts(request_id)
+        challenge: CaptchaChallenge | None = None
+        if captcha_attempts + 1 >= max_attempts:
+            attempts = await self.storage.increment_captcha_attempts(request_id)
+        else:
+            # The next captcha is only needed when attempts remain, so it is stored with the failed attempt.
+            challenge = await self._next_captcha(captcha_difficulty)
+            attempts = await self.storage.fail_and_refresh_captcha(request_id, challenge.prompt, challenge.answer)
+
+        if attempts is None:
+            return
         if attempts >= max_attempts:
             declined = await self.try_decline_request(request)
             if declined:
-                self.storage.complete(request_id, "declined", None, f"captcha_failed:{captcha_difficulty}")
+                self.storage.complete_nowait(request_id, "declined", None, f"captcha_failed:{captcha_difficulty}")
             await message.answer(
                 "Limite tentativi raggiunto. Richiesta rifiutata. Invia una nuova richiesta al canale."
             )
             return
 
-        challenge = generate_captcha(difficulty=captcha_difficulty)
-        self.storage.refresh_captcha(request_id, challenge.prompt, challenge.answer)
+        if challenge is None:
+            challenge = await self._next_captcha(captcha_difficulty)
+            await self.storage.refresh_captcha(request_id, challenge.prompt, challenge.answer)
         remaining = max_attempts - attempts
         await self.safe_send_user_captcha(
-            int(request["user_chat_id"]),
+            user_chat_id,
             challenge.image_bytes,
             (
                 "Risposta errata.\n"
@@ -947,7 +1648,8 @@ class JoinGuardBot:
             await callback.answer("Azione non valida.", show_alert=True)
             return
 
-        if not self._is_admin(callback.from_user.id if callback.from_user else None):
+        admin_id = callback.from_user.id if callback.from_user else None
+        if not self._is_admin(admin_id):
             await callback.answer("Non hai i permessi per questa azione.", show_alert=True)
             return
 
@@ -957,59 +1659,109 @@ class JoinGuardBot:
             return
 
         action, request_id = parsed
-        request = self.storage.get(request_id)
+        request = await self.storage.claim_pending_admin(request_id)
         if request is None:
-            await callback.answer("Richiesta non trovata.", show_alert=True)
-            return
-
-        if request["status"] != "pending_admin":
-            await callback.answer("La richiesta e gia stata elaborata.", show_alert=True)
+            if await self.storage.get(request_id) is None:
+                await callback.answer("Richiesta non trovata.", show_alert=True)
+            else:
+                await callback.answer("La richiesta e gia stata elaborata.", show_alert=True)
             return
 
-        user_chat_id = int(request["user_chat_id"])
+        user_chat_id = request.user_chat_id
+        user_id = request.user_id
+        # The click may come from a single-request message or the /pending panel; put back whichever it was.
+        original_markup = callback.message.reply_markup if callback.message else None
         if action == "approve":
-            approved = await self.try_approve_request(request)
+            # Drop the buttons while Telegram processes the approval so a second tap has nothing to hit.
+            # Markup edits are exempt from the per-chat bucket, so this does not delay the final edit_text.
+            try:
+                approved, _ = await asyncio.gather(
+                    self.try_approve_request(request),
+                    self._set_admin_keyboard(callback, None),
+                )
+            except BaseException:
+                # Network/server errors must not leave the request stuck in 'processing'.
+                await self._undo_admin_claim(callback, request_id, original_markup)
+                raise
             if not approved:
+                await self._undo_admin_claim(callback, request_id, original_markup)
                 await callback.answer("Impossibile approvare la richiesta.", show_alert=True)
                 return
-            self.storage.complete(request_id, "approved", callback.from_user.id, "manual_approve")
-            await self.safe_send_user_message(
-                user_chat_id,
-                "Un amministratore ha approvato la tua richiesta. Benvenuto nel canale.",
-            )
-            final_text = self._build_admin_result_text(request, "approvata", callback.from_user.id)
-            if callback.message:
-                await callback.message.edit_text(final_text)
-            logging.info(
-                "admin_decision request_id=%s action=approve admin_id=%s user_id=%s risk_score=%s",
-                request_id,
-                callback.from_user.id,
-                request["user_id"],
-                request["risk_score"],
-            )
             await callback.answer("Richiesta approvata.")
+            final_text = self._build_admin_result_text(request, "approvata", admin_id)
+            follow_ups = [
+                self.storage.complete(request_id, "approved", admin_id, "manual_approve"),
+                self.safe_send_user_message(
+                    user_chat_id,
+                    "Un amministratore ha approvato la tua richiesta. Benvenuto nel canale.",
+                ),
+            ]
+            if callback.message:
+                follow_ups.append(callback.message.edit_text(final_text))
+            await asyncio.gather(*follow_ups)
+            self._invalidate_panel_cache()
+            if logging.root.isEnabledFor(logging.INFO):
+                logging.info(
+                    "admin_decision request_id=%s action=approve admin_id=%s user_id=%s risk_score=%s",
+                    request_id,
+                    admin_id,
+                    user_id,
+                    request.risk_score,
+                )
             return
 
-        declined = await self.try_decline_request(request)
+        try:
+            declined, _ = await asyncio.gather(
+                self.try_decline_request(request),
+                self._set_admin_keyboard(callback, None),
+            )
+        except BaseException:
+            await self._undo_admin_claim(callback, request_id, original_markup)
+            raise
         if not declined:
+            await self._undo_admin_claim(callback, request_id, original_markup)
             await callback.answer("Impossibile rifiutare la richiesta.", show_alert=True)
             return
-        self.storage.complete(request_id, "declined", callback.from_user.id, "manual_decline")
-        await self.safe_send_user_message(
-            user_chat_id,
-            "Un amministratore ha rifiutato la tua richiesta al canale.",
-        )
-        final_text = self._build_admin_result_text(request, "rifiutata", callback.from_user.id)
-        if callback.message:
-            await callback.message.edit_text(final_text)
-        logging.info(
-            "admin_decision request_id=%s action=decline admin_id=%s user_id=%s risk_score=%s",
-            request_id,
-            callback.from_user.id,
-            request["user_id"],
-            request["risk_score"],
-        )
         await callback.answer("Richiesta rifiutata.")
+        final_text = self._build_admin_result_text(request, "rifiutata", admin_id)
+        follow_ups = [
+            self.storage.complete(request_id, "declined", admin_id, "manual_decline"),
+            self.safe_send_user_message(
+                user_chat_id,
+                "Un amministratore ha rifiutato la tua richiesta al canale.",
+            ),
+        ]
+        if callback.message:
+            follow_ups.append(callback.message.edit_text(final_text))
+        await asyncio.gather(*follow_ups)
+        self._invalidate_panel_cache()
+        if logging.root.isEnabledFor(logging.INFO):
+            logging.info(
+                "admin_decision request_id=%s action=decline admin_id=%s user_id=%s risk_score=%s",
+                request_id,
+                admin_id,
+                user_id,
+                request.risk_score,
+            )
+
+    async def _undo_admin_claim(
+        self,
+        callback: CallbackQuery,
+        request_id: int,
+        markup: InlineKeyboardMarkup | None,
+    ) -> None:
+        try:
+            await self._set_admin_keyboard(callback, markup)
+        finally:
+            await self.storage.release_claim(request_id, "pending_admin")
+
+    async def _set_admin_keyboard(self, callback: CallbackQuery, keyboard: InlineKeyboardMarkup | None) -> None:
+        if not callback.message:
+            return
+        try:
+            await callback.message.edit_reply_markup(reply_markup=keyboard)
+        except TelegramBadRequest as exc:
+            logging.warning("edit_reply_markup failed: %s", exc)
 
     async def notify_admins(
         self,
@@ -1034,13 +1786,34 @@ class JoinGuardBot:
             f"request_id: {request_id}"
         )
 
-        keyboard = build_admin_keyboard(request_id)
-        for admin_id in self.settings.admin_ids:
+        # Built once without validation (reply_markup is a JSON string); each admin gets a chat_id copy.
+        template = SendMessage.model_construct(
+            chat_id=0,
+            text=text,
+            reply_markup=build_admin_keyboard_json(request_id),
+        )
+        admin_ids = tuple(self._admin_ids)
+        results = await asyncio.gather(
+            *(self._notify_admin(admin_id, template) for admin_id in admin_ids),
+            return_exceptions=True,
+        )
+        # TaskGroup would need Python 3.11; gather keeps 3.10 support and still reports each failure.
+        for admin_id, result in zip(admin_ids, results):
+            if isinstance(result, Exception):
+                self._admin_delivery_failures[admin_id] += 1
+                logging.error(
+                    "Unexpected error notifying admin %s about request %s: %r", admin_id, request_id, result
+                )
+
+    async def _notify_admin(self, admin_id: int, template: SendMessage) -> None:
+        async with self._admin_sem:
             try:
-                await self.bot.send_message(admin_id, text, reply_markup=keyboard)
+                await self.bot(template.model_copy(update={"chat_id": admin_id}))
             except TelegramForbiddenError:
+                self._admin_delivery_failures[admin_id] += 1
                 logging.warning("Admin %s has not started the bot or blocked it", admin_id)
             except TelegramBadRequest as exc:
+                self._admin_delivery_failures[admin_id] += 1
                 logging.warning("Failed to notify admin %s: %s", admin_id, str(exc))
 
     async def safe_send_user_message(
@@ -1065,105 +1838,126 @@ class JoinGuardBot:
         except TelegramBadRequest as exc:
             logging.warning("Cannot send captcha to user_chat_id=%s: %s", user_chat_id, str(exc))
 
-    async def try_approve_request(self, request: sqlite3.Row) -> bool:
+    async def try_approve_request(self, request: JoinRequestRecord | PendingCaptcha) -> bool:
         try:
             await self.bot.approve_chat_join_request(
-                chat_id=int(request["channel_id"]),
-                user_id=int(request["user_id"]),
+                chat_id=request.channel_id,
+                user_id=request.user_id,
             )
             return True
         except TelegramBadRequest as exc:
             logging.warning("approve_chat_join_request failed: %s", str(exc))
             return False
 
-    async def try_decline_request(self, request: sqlite3.Row) -> bool:
+    async def try_decline_request(self, request: JoinRequestRecord | PendingCaptcha) -> bool:
         try:
             await self.bot.decline_chat_join_request(
-                chat_id=int(request["channel_id"]),
-                user_id=int(request["user_id"]),
+                chat_id=request.channel_id,
+                user_id=request.user_id,
             )
             return True
         except TelegramBadRequest as exc:
             logging.warning("decline_chat_join_request failed: %s", str(exc))
             return False
 
-    def _build_admin_result_text(self, request: sqlite3.Row, status_text: str, admin_id: int) -> str:
-        username = f"@{request['username']}" if request["username"] else "non impostato"
-        risk_reasons = deserialize_risk_reasons(request["risk_reasons"])
+    def _build_admin_result_text(self, request: JoinRequestRecord, status_text: str, admin_id: int) -> str:
+        username = f"@{request.username}" if request.username else "non impostato"
+        risk_reasons = deserialize_risk_reasons(request.risk_reasons)
         risk_details = "; ".join(risk_reasons) if risk_reasons else "none"
         return (
             "Richiesta elaborata\n"
-            f"Utente: {request['first_name']} {request['last_name'] or ''}\n"
-            f"ID: {request['user_id']}\n"
+            f"Utente: {request.first_name} {request.last_name or ''}\n"
+            f"ID: {request.user_id}\n"
             f"Username: {username}\n"
-            f"Risk score: {request['risk_score']}\n"
+            f"Risk score: {request.risk_score}\n"
             f"Risk details: {risk_details}\n"
             f"Stato: {status_text}\n"
             f"Amministratore: {admin_id}"
         )
 
-    def _build_dashboard_text(self) -> str:
-        mode = self.storage.get_moderation_mode()
-        now_ts = int(datetime.now(tz=timezone.utc).timestamp())
-        stats = self.storage.get_status_stats(now_ts - 24 * 3600)
-        recent = self.storage.list_recent_decisions(limit=5)
-
-        total = sum(stats.values())
-        lines = [
-            "JoinGuard Control Center (24h)",
-            f"Modo moderazione: {mode}",
-            f"Totale richieste: {total}",
-            f"- new: {stats.get('new', 0)}",
-            f"- pending_admin: {stats.get('pending_admin', 0)}",
-            f"- pending_captcha: {stats.get('pending_captcha', 0)}",
-            f"- approved: {stats.get('approved', 0)}",
-            f"- declined: {stats.get('declined', 0)}",
-            "",
-            "Policy rischio:",
-            f"- admin threshold: >= {self.settings.risk_score_to_admin}",
-            f"- hard captcha threshold: >= {self.settings.risk_score_to_hard_captcha}",
-            f"- hard captcha attempts: {self.settings.hard_captcha_attempts}",
-        ]
+    async def _cached(self, key: str, ttl: float, factory):
+        hit, value = ttl_cache_get(self._panel_cache, key, ttl)
+        if hit:
+            return value
+        value = await factory()
+        ttl_cache_put(self._panel_cache, key, value, PANEL_CACHE_SIZE)
+        return value
 
-        if recent:
-            lines.append("")
-            lines.append("Ultime decisioni:")
-            for item in recent:
-                decided_at = int(item["decision_at"]) if item["decision_at"] else 0
-                stamp = datetime.fromtimestamp(decided_at, tz=timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
-                lines.append(
-                    (
-                        f"#{item['id']} {item['status']} user={item['user_id']} "
-                        f"risk={item['risk_score']} at={stamp}"
-                    )
-                )
-        return "\n".join(lines)
+    def _invalidate_panel_cache(self) -> None:
+        self._panel_cache.clear()
 
-    def _build_pending_text(self, pending: list[sqlite3.Row]) -> str:
+    async def _load_panel_snapshot(self) -> PanelSnapshot:
+        return await self._cached("snapshot", PANEL_SNAPSHOT_TTL_SECONDS, self._fetch_panel_snapshot)
+
+    async def _fetch_panel_snapshot(self) -> PanelSnapshot:
+        since_ts = int(time.time()) - 24 * 3600
+        return await self.storage.snapshot_for_panel(since_ts, pending_limit=8, recent_limit=5)
+
+    def _build_dashboard_text(self, snapshot: PanelSnapshot) -> str:
+        stats = dict.fromkeys(("new", "pending_admin", "pending_captcha", "processing", "approved", "declined"), 0)
+        stats.update(snapshot.stats)
+        settings = self.settings
+        text = (
+            "JoinGuard Control Center (24h)\n"
+            f"Modo moderazione: {snapshot.mode}\n"
+            f"Totale richieste: {sum(snapshot.stats.values())}\n"
+            f"- new: {stats['new']}\n"
+            f"- pending_admin: {stats['pending_admin']}\n"
+            f"- pending_captcha: {stats['pending_captcha']}\n"
+            f"- processing: {stats['processing']}\n"
+            f"- approved: {stats['approved']}\n"
+            f"- declined: {stats['declined']}\n"
+            "\n"
+            "Policy rischio:\n"
+            f"- admin threshold: >= {settings.risk_score_to_admin}\n"
+            f"- hard captcha threshold: >= {settings.risk_score_to_hard_captcha}\n"
+            f"- hard captcha attempts: {settings.hard_captcha_attempts}"
+        )
+        if snapshot.recent:
+            text += "\n\nUltime decisioni:\n" + "\n".join(
+                f"#{item.id} {item.status} user={item.user_id} "
+                f"risk={item.risk_score} at={format_utc_minute(item.decision_at or 0)}"
+                for item in snapshot.recent
+            )
+        if self._admin_delivery_failures:
+            text += "\n\nNotifiche admin fallite:\n" + "\n".join(
+                f"- {admin_id}: {count}" for admin_id, count in self._admin_delivery_failures.most_common()
+            )
+        return text
+
+    def _build_pending_text(self, pending: list[JoinRequestRecord]) -> str:
         if not pending:
             return "Nessuna richiesta in pending_admin."
         lines = [f"Pending review: {len(pending)}"]
         for item in pending:
-            username = f"@{item['username']}" if item["username"] else "non impostato"
-            reasons = deserialize_risk_reasons(item["risk_reasons"])
+            username = f"@{item.username}" if item.username else "non impostato"
+            reasons = deserialize_risk_reasons(item.risk_reasons)
             short_reason = ", ".join(reasons[:2]) if reasons else "none"
-            age_days = item["estimated_age_days"] if item["estimated_age_days"] is not None else "n/a"
+            age_days = item.estimated_age_days if item.estimated_age_days is not None else "n/a"
             lines.append(
                 (
-                    f"#{item['id']} user={item['user_id']} {username} "
-                    f"risk={item['risk_score']} eta={age_days}g"
+                    f"#{item.id} user={item.user_id} {username} "
+                    f"risk={item.risk_score} eta={age_days}g"
                 )
             )
             lines.append(f"reason: {short_reason}")
         return "\n".join(lines)
 
-    async def _build_channel_text(self) -> str:
-        mode = self.storage.get_moderation_mode()
+    async def _build_channel_text(self, mode: str) -> str:
+        return await self._cached(
+            f"channel:{mode}",
+            CHANNEL_TEXT_TTL_SECONDS,
+            lambda: self._fetch_channel_text(mode),
+        )
+
+    async def _fetch_channel_text(self, mode: str) -> str:
         try:
-            chat = await self.bot.get_chat(self.settings.channel_id)
-            members = await self.bot.get_chat_member_count(self.settings.channel_id)
-            me = await self.bot.get_me()
-            bot_member = await self.bot.get_chat_member(self.settings.channel_id, me.id)
+            # Bot.id is parsed from the token, so no getMe round trip is needed for the membership lookup.
+            chat, members, bot_member = await asyncio.gather(
+                self.bot.get_chat(self.settings.channel_id),
+                self.bot.get_chat_member_count(self.settings.channel_id),
+                self.bot.get_chat_member(self.settings.channel_id, self.bot.id),
+            )
             can_invite = getattr(bot_member, "can_invite_users", None)
             can_manage_chat = getattr(bot_member, "can_manage_chat", None)
             return (
@@ -1186,10 +1980,16 @@ class JoinGuardBot:
     async def run(self) -> None:
         # The bot is designed to work in long polling mode, so we disable webhook on startup.
         await self.bot.delete_webhook(drop_pending_updates=False)
+        self._captcha_refill_tasks = [
+            asyncio.create_task(self._refill_captchas(difficulty)) for difficulty in self._captcha_pool
+        ]
         await self.dp.start_polling(self.bot, allowed_updates=self.dp.resolve_used_update_types())
 
     async def close(self) -> None:
-        self.storage.close()
+        for task in self._captcha_refill_tasks:
+            task.cancel()
+        await asyncio.gather(*self._captcha_refill_tasks, return_exceptions=True)
+        await self.storage.close()
         await self.bot.session.close()
 
 
@@ -1211,4 +2011,7 @@ async def main() -> None:
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())